@@ -0,0 +1,208 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+from time import time
+import json
+import os
+
+try:
+    from urllib import quote
+    from urllib2 import urlopen
+except ImportError:
+    from urllib.parse import quote
+    from urllib.request import urlopen
+
+DOCUMENTATION = '''
+---
+module: aur_facts
+short_description: Gathers installed and AUR versions of packages
+description:
+     - Sets the fact C(aur_packages), mapping every package in C(names) to its installed version,
+       its version in the AUR and whether it is outdated, i.e. not installed or older than in the
+       AUR. C(aur_outdated) lists the outdated packages, C(aur_versions) the AUR versions.
+     - Installed versions come from a single listing of the local pacman database, AUR versions
+       from one batched RPC request, cached in C(cache_dir) for C(cache_ttl) seconds.
+options:
+  names:
+    description:
+      - The packages to gather versions for, typically every AUR package of the play.
+    required: true
+
+  installed:
+    description:
+      - Whether to read installed versions. Disable it when gathering AUR versions on the
+        controller only.
+    required: false
+    default: "yes"
+
+  upstream:
+    description:
+      - Whether to query the AUR. When disabled, C(aur_versions) can pass in versions gathered
+        before, e.g. by a run on the controller.
+    required: false
+    default: "yes"
+
+  aur_versions:
+    description:
+      - AUR versions by package name to use instead of querying the AUR.
+    required: false
+    default: null
+
+  cache_dir:
+    description:
+      - Directory for the cache of AUR versions.
+    required: false
+    default: "~/.cache/aur_facts"
+
+  cache_ttl:
+    description:
+      - Seconds a cached AUR version is used without asking the AUR again.
+    required: false
+    default: 3600
+
+  db_path:
+    description:
+      - The pacman database directory.
+    required: false
+    default: "/var/lib/pacman"
+
+  aur_url:
+    description:
+      - Base url of the AUR.
+    required: false
+    default: "https://aur.archlinux.org"
+
+notes: []
+requirements: []
+'''
+
+EXAMPLES = '''
+- name: Gather AUR versions once, cached on the controller
+  aur_facts:
+    names: "{{ aur_packages_wanted }}"
+    installed: no
+  connection: local
+  become: no
+  run_once: yes
+  register: aur_upstream
+
+- name: Compare them with what each host has installed
+  aur_facts:
+    names: "{{ aur_packages_wanted }}"
+    upstream: no
+    aur_versions: "{{ aur_upstream.ansible_facts.aur_versions }}"
+
+- include: build_aur.yml
+  when: aur_outdated | length > 0
+'''
+
+# names per RPC request, keeps the url well below the AUR's length limit
+CHUNK = 150
+
+
+class AurFacts(object):
+
+    def __init__(self, module):
+        self.m = module
+        for k,v in self.m.params.items():
+            setattr(self, k, v)
+        self.cache_file = os.path.join(os.path.expanduser(self.cache_dir), 'versions.json')
+
+    def installed_versions(self):
+        """versions from the names of the local database entries, <name>-<pkgver>-<pkgrel>"""
+        local = os.path.join(self.db_path, 'local')
+        wanted = set(self.names)
+        versions = {}
+        for entry in os.listdir(local):
+            if entry.count('-') < 2:
+                continue
+            name, ver, rel = entry.rsplit('-', 2)
+            if name in wanted:
+                versions[name] = '%s-%s' % (ver, rel)
+        return versions
+
+    def _load_cache(self):
+        try:
+            with open(self.cache_file) as f:
+                return json.load(f)
+        except (IOError, OSError, ValueError):
+            return {}
+
+    def _save_cache(self, cache):
+        try:
+            d = os.path.dirname(self.cache_file)
+            if not os.path.isdir(d):
+                os.makedirs(d, 0o700)
+            tmp = '%s.%d' % (self.cache_file, os.getpid())
+            with open(tmp, 'w') as f:
+                json.dump(cache, f)
+            os.rename(tmp, self.cache_file)
+        except (IOError, OSError):
+            pass
+
+    def upstream_versions(self):
+        """AUR versions, from the cache or one batched request for what is missing or expired"""
+        now = time()
+        cache = self._load_cache()
+        stale = sorted(n for n in set(self.names)
+                       if n not in cache or now - cache[n]['fetched'] > self.cache_ttl)
+        for i in range(0, len(stale), CHUNK):
+            chunk = stale[i:i + CHUNK]
+            args = '&'.join('arg[]=%s' % quote(n) for n in chunk)
+            try:
+                resp = urlopen('%s/rpc/?v=5&type=info&%s' % (self.aur_url, args), timeout=30)
+                results = json.loads(resp.read().decode('utf-8')).get('results', [])
+            except (IOError, OSError, ValueError) as e:
+                self.m.fail_json(msg='failed to query the AUR: %s' % e)
+            found = dict((r['Name'], r) for r in results)
+            for n in chunk:
+                r = found.get(n, {})
+                # packages missing from the AUR are cached as well
+                cache[n] = {'version': r.get('Version'), 'fetched': now}
+        if stale and not self.m.check_mode:
+            self._save_cache(cache)
+        return dict((n, cache[n]) for n in self.names)
+
+    def facts(self):
+        installed = self.installed_versions() if self.installed else {}
+        if self.upstream:
+            upstream = self.upstream_versions()
+        else:
+            upstream = dict((n, {'version': v}) for n, v in (self.aur_versions or {}).items())
+
+        packages = {}
+        for n in self.names:
+            inst = installed.get(n)
+            aur = upstream.get(n, {}).get('version')
+            packages[n] = {'installed': inst,
+                           'aur': aur,
+                           'outdated': self.installed and (inst is None or
+                                                           (aur is not None and vercmp(inst, aur) < 0))}
+        return {'aur_packages': packages,
+                'aur_outdated': sorted(n for n, p in packages.items() if p['outdated']),
+                'aur_versions': dict((n, p['aur']) for n, p in packages.items() if p['aur'])}
+
+
+def main():
+    module = AnsibleModule(
+        argument_spec = dict(
+            names=dict(required=True, type='list'),
+            installed=dict(default='yes', type='bool'),
+            upstream=dict(default='yes', type='bool'),
+            aur_versions=dict(default=None, type='dict'),
+            cache_dir=dict(default='~/.cache/aur_facts', type='str'),
+            cache_ttl=dict(default=3600, type='int'),
+            db_path=dict(default='/var/lib/pacman', type='str'),
+            aur_url=dict(default='https://aur.archlinux.org', type='str')
+        ),
+        supports_check_mode=True
+    )
+
+    facts = AurFacts(module).facts()
+
+    module.exit_json(changed=False, ansible_facts=facts)
+
+
+from ansible.module_utils.basic import *
+from ansible.module_utils.vercmp import vercmp
+main()
@@ -2,8 +2,21 @@
 # -*- coding: utf-8 -*-
 # © Thelonius Kort - Feel free to redistribute this with any MIT, GPL, or Apache License
 
-from time import sleep
+from time import sleep, time
+from hashlib import sha1
+import base64
+import json
+import os
+import random
 import re
+import struct
+
+try:
+    import httplib
+    from urllib import quote
+except ImportError:
+    import http.client as httplib
+    from urllib.parse import quote
 
 DOCUMENTATION = '''
 ---
@@ -43,16 +56,73 @@ options:
 
   delay:
     description:
-      - Delay between retries
+      - Base delay between retries. A server that keeps failing is put on a cooldown that
+        doubles with every consecutive failure (with jitter), starting from this value. Only
+        servers that do not answer or answer with a server error fail, not having the key
+        does not count.
     required: false
     default: 0.5
 
+  cache_dir:
+    description:
+      - Directory where the module keeps its state between runs, e.g. the keyserver scoreboard
+        that records success rate and latency per server. Servers are tried fastest-healthy-first
+        according to it.
+    required: false
+    default: "~/.cache/gpg_import"
+
   gpg_timeout:
     description:
       - Timeout parameter for gpg
     required: false
     default: 5
 
+  fetch:
+    description:
+      - How keys are fetched. C(gpg) lets gpg (and dirmngr) talk to the keyserver. C(hkp) fetches
+        the key in-process over HKP/HKPS with one kept-alive connection per server, stores it in a
+        local cache keyed by fingerprint and feeds it to `gpg --import`. Only hexadecimal key ids
+        are fetched this way, anything else falls back to C(gpg).
+    required: false
+    choices: [ "gpg", "hkp" ]
+    default: "gpg"
+
+  max_age:
+    description:
+      - With C(state=latest) a key is only refreshed from a keyserver when its last refresh by
+        this module is older than this many seconds, or when the key or one of its subkeys
+        expires within C(expiry_margin) seconds.
+    required: false
+    default: 86400
+
+  expiry_margin:
+    description:
+      - Seconds before the expiry of a key or subkey from which on it is refreshed regardless
+        of C(max_age).
+    required: false
+    default: 2592000
+
+  log_size:
+    description:
+      - Number of characters of stdout and stderr kept per attempt in the returned C(log_dic).
+        Output is cut from the front, as gpg reports errors last. Only the last C(log_tries)
+        attempts per command are kept.
+    required: false
+    default: 512
+
+  log_tries:
+    description:
+      - Number of attempts per command kept in the returned C(log_dic).
+    required: false
+    default: 5
+
+  cache_ttl:
+    description:
+      - Seconds a key fetched with C(fetch=hkp) is served from the local cache without asking a
+        keyserver again when it is imported. Refreshes always ask a keyserver.
+    required: false
+    default: 604800
+
 notes: []
 requirements: [ gpg ]
 author: Thelonius Kort
@@ -69,10 +139,286 @@ EXAMPLES = '''
       - 'hkp://no.way.ever'
       - 'keys.gnupg.net'
       - 'hkps://hkps.pool.sks-keyservers.net'
+- name: Install GPG key over HKPS, reusing a cache shared between machines
+  gpg_import:
+    key_id: "0x3804BB82D39DC0E3"
+    fetch: hkp
+    cache_dir: /srv/nfs/gpg_import
+    servers:
+      - 'hkps://keys.openpgp.org'
 - name: Install or fail with fake and not fake GPG keys
   gpg_import:
 '''
 
+class ServerScoreboard(object):
+    """per-keyserver health, persisted between runs
+
+    Success rate and latency are exponentially decayed averages, so a server that
+    recovers (or degrades) is re-ranked after a few runs."""
+
+    decay = 0.3
+    max_cooldown = 3600
+
+    def __init__(self, path, base_delay):
+        self.path = path
+        self.base_delay = base_delay
+        self.servers = {}
+        try:
+            with open(path) as f:
+                self.servers = json.load(f).get('servers', {})
+        except (IOError, OSError, ValueError, AttributeError):
+            pass
+
+    def _entry(self, url):
+        return self.servers.setdefault(url, {'success': 1.0, 'latency': 0.0,
+                                             'failures': 0, 'cooldown_until': 0})
+
+    def cooldown(self, url):
+        """seconds until `url` may be tried again"""
+        return max(0, self.servers.get(url, {}).get('cooldown_until', 0) - time())
+
+    def order(self, urls):
+        """healthy servers first, fastest (latency weighted by success rate) first"""
+        def score(item):
+            n, u = item
+            e = self.servers.get(u)
+            if e is None:
+                return (False, 0, n)
+            return (self.cooldown(u) > 0, e['latency'] / max(e['success'], 0.05), n)
+        return [u for n, u in sorted(enumerate(urls), key=score)]
+
+    def record(self, url, ok, elapsed):
+        e = self._entry(url)
+        e['success'] = (1 - self.decay) * e['success'] + self.decay * (1.0 if ok else 0.0)
+        if ok:
+            e['latency'] = elapsed if not e['latency'] \
+                else (1 - self.decay) * e['latency'] + self.decay * elapsed
+            e['failures'] = 0
+            e['cooldown_until'] = 0
+        else:
+            e['failures'] += 1
+            e['cooldown_until'] = time() + self.backoff(e['failures'])
+
+    def backoff(self, failures):
+        """exponential backoff, jittered over the upper half of the interval"""
+        cap = min(self.max_cooldown, self.base_delay * 2 ** (failures - 1))
+        return random.uniform(cap / 2, cap)
+
+    def save(self):
+        # the scoreboard is only an optimisation, never fail the task over it
+        try:
+            d = os.path.dirname(self.path)
+            if not os.path.isdir(d):
+                os.makedirs(d, 0o700)
+            tmp = '%s.%d' % (self.path, os.getpid())
+            with open(tmp, 'w') as f:
+                json.dump({'servers': self.servers}, f)
+            os.rename(tmp, self.path)
+        except (IOError, OSError):
+            pass
+
+
+def dearmor(text):
+    """binary packets of an ascii armored key block"""
+    lines = text.strip().splitlines()
+    try:
+        start = lines.index('') + 1
+    except ValueError:
+        start = 1
+    body = []
+    for line in lines[start:]:
+        if line.startswith('=') or line.startswith('-----'):
+            break
+        body.append(line.strip())
+    return base64.b64decode(''.join(body))
+
+
+def fingerprints(data):
+    """v4 fingerprints of all primary keys and subkeys in `data`"""
+    b = bytearray(data)
+    fprs = []
+    i = 0
+    while i < len(b):
+        c = b[i]
+        if c & 0x40:
+            tag = c & 0x3f
+            o = b[i + 1]
+            if o < 192:
+                hl, l = 2, o
+            elif o < 224:
+                hl, l = 3, ((o - 192) << 8) + b[i + 2] + 192
+            elif o == 255:
+                hl, l = 6, struct.unpack('>I', bytes(b[i + 2:i + 6]))[0]
+            else:
+                # partial body lengths are not used for key material
+                break
+        else:
+            tag = (c >> 2) & 0xf
+            lt = c & 3
+            if lt == 3:
+                hl, l = 1, len(b) - i - 1
+            else:
+                n = (1, 2, 4)[lt]
+                hl = 1 + n
+                l = struct.unpack(('>B', '>H', '>I')[lt], bytes(b[i + 1:i + hl]))[0]
+        body = bytes(b[i + hl:i + hl + l])
+        if tag in (6, 14) and body[:1] == b'\x04':
+            fprs.append(sha1(b'\x99' + struct.pack('>H', len(body)) + body).hexdigest().upper())
+        i += hl + l
+    return fprs
+
+
+def parse_colons(out):
+    """keys from `gpg --with-colons --fixed-list-mode` output, with their subkeys"""
+    keys = []
+    current = None
+    for line in out.splitlines():
+        f = line.split(':')
+        if f[0] in ('pub', 'sub'):
+            current = {'keyid': f[4].upper(), 'fpr': None, 'validity': f[1],
+                       'expires': int(f[6]) if f[6] else None}
+            if f[0] == 'pub':
+                current['subkeys'] = []
+                keys.append(current)
+            elif keys:
+                keys[-1]['subkeys'].append(current)
+        elif f[0] == 'fpr' and current is not None and current['fpr'] is None:
+            current['fpr'] = f[9].upper()
+        elif f[0] not in ('fpr', 'grp'):
+            current = None
+    return keys
+
+
+class KeyringIndex(object):
+    """maps fingerprints, long and short key ids of primary keys and subkeys to their primary keys"""
+
+    def __init__(self, keys):
+        self.ids = {}
+        for k in keys:
+            for e in [k] + k['subkeys']:
+                idents = set([e['keyid'][-16:], e['keyid'][-8:]])
+                if e['fpr']:
+                    idents.add(e['fpr'])
+                for i in idents:
+                    primaries = self.ids.setdefault(i, [])
+                    if k not in primaries:
+                        primaries.append(k)
+
+    def lookup(self, hex_id):
+        """primary keys matching `hex_id`, more than one only for colliding short ids"""
+        return self.ids.get(hex_id, [])
+
+
+class HkpError(IOError):
+    """an error status a keyserver answered with"""
+
+    def __init__(self, status, url):
+        IOError.__init__(self, 'HTTP %d from %s' % (status, url))
+        self.status = status
+
+
+class HkpClient(object):
+    """fetches keys over HKP/HKPS, keeping one connection per server alive"""
+
+    pool = {}
+
+    def __init__(self, timeout):
+        self.timeout = timeout
+
+    def _connection(self, url):
+        m = re.match(r'(hkps?)://([^/:]+)(?::(\d+))?', url)
+        scheme, host, port = m.groups()
+        port = int(port or (443 if scheme == 'hkps' else 11371))
+        key = (scheme, host, port)
+        # failed connections leave the pool, so a pooled one has served a request before
+        reused = key in self.pool
+        if not reused:
+            cls = httplib.HTTPSConnection if scheme == 'hkps' else httplib.HTTPConnection
+            self.pool[key] = cls(host, port, timeout=self.timeout)
+        return key, self.pool[key], reused
+
+    def get(self, url, key_id):
+        """armored key block for `key_id` from the server at `url`"""
+        path = '/pks/lookup?op=get&options=mr&search=%s' % quote('0x' + key_id)
+        while True:
+            key, conn, reused = self._connection(url)
+            try:
+                conn.request('GET', path, headers={'Connection': 'keep-alive'})
+                resp = conn.getresponse()
+                body = resp.read()
+            except (httplib.HTTPException, IOError, OSError):
+                conn.close()
+                del self.pool[key]
+                # the server may have dropped a kept-alive connection, retry that once on a
+                # fresh one, but never wait twice for a server that did not answer at all
+                if not reused:
+                    raise
+                continue
+            if resp.status != 200:
+                raise HkpError(resp.status, url)
+            return body.decode('ascii', 'replace')
+
+
+class KeyCache(object):
+    """armored keys on disk, one file per primary fingerprint"""
+
+    def __init__(self, path, ttl):
+        self.path = path
+        self.ttl = ttl
+
+    def _index(self):
+        try:
+            with open(os.path.join(self.path, 'index.json')) as f:
+                return json.load(f)
+        except (IOError, OSError, ValueError):
+            return {}
+
+    def get(self, key_id):
+        fpr = self._index().get(key_id)
+        if fpr is None:
+            return None
+        fn = os.path.join(self.path, '%s.asc' % fpr)
+        try:
+            if time() - os.path.getmtime(fn) > self.ttl:
+                return None
+            with open(fn) as f:
+                return f.read()
+        except (IOError, OSError):
+            return None
+
+    def drop(self, key_id):
+        index = self._index()
+        fpr = index.pop(key_id, None)
+        if fpr is None:
+            return
+        try:
+            os.remove(os.path.join(self.path, '%s.asc' % fpr))
+        except (IOError, OSError):
+            pass
+        self._save_index(index)
+
+    def put(self, key_id, fpr, armored):
+        try:
+            if not os.path.isdir(self.path):
+                os.makedirs(self.path, 0o700)
+            with open(os.path.join(self.path, '%s.asc' % fpr), 'w') as f:
+                f.write(armored)
+        except (IOError, OSError):
+            return
+        index = self._index()
+        index[key_id] = fpr
+        self._save_index(index)
+
+    def _save_index(self, index):
+        try:
+            tmp = os.path.join(self.path, 'index.json.%d' % os.getpid())
+            with open(tmp, 'w') as f:
+                json.dump(index, f)
+            os.rename(tmp, os.path.join(self.path, 'index.json'))
+        except (IOError, OSError):
+            pass
+
+
 class GpgImport(object):
 
     def __init__(self, module):
@@ -81,66 +427,231 @@ class GpgImport(object):
         self._execute_task()
 
     def _execute_task(self):
-        res = self._execute_command('check')
-        key_present = res['rc'] == 0
+        if self.is_hex:
+            # one listing of the whole keyring, matched exactly instead of by gpg's user id search
+            res = self._execute_command('list')
+            index = KeyringIndex(parse_colons(res['stdout']) if res['rc'] == 0 else [])
+            keys = index.lookup(self.hex_id)
+            if keys:
+                self._format_commands(' '.join(k['fpr'] or k['keyid'] for k in keys))
+        else:
+            res = self._execute_command('check')
+            keys = parse_colons(res['stdout']) if res['rc'] == 0 else []
+        key_present = len(keys) > 0
 
         if key_present and self.state == 'absent':
             res = self._execute_command('delete')
             self.changed = res['rc'] == 0
+        elif key_present and self.state in ('latest','refreshed') and not self._is_stale(keys):
+            self.changed = False
+            res = {'rc': 0}
         elif key_present and self.state in ('latest','refreshed'):
+            # a refresh is after newer material, so it always asks a keyserver
             res = self._repeat_command('refresh')
-            self.changed = re.search('gpg:\s+unchanged: 1\n', res['stderr']) is None
+            self.changed = re.search(r'gpg:\s+unchanged: 1\n', res['stderr']) is None
+            if res['rc'] == 0:
+                self._mark_refreshed([k['fpr'] or k['keyid'] for k in keys])
         elif not key_present and self.state in ('present','latest','refreshed'):
-            res = self._repeat_command('recv')
+            res = self._cached_import('recv') or self._repeat_command('recv')
             self.changed = res['rc'] == 0
+            if res['rc'] == 0 and self.state in ('latest','refreshed'):
+                # just fetched, so the next run need not refresh it
+                self._mark_refreshed(self._imported_ids(res))
         else:
             self.changed = False
             res = {'rc': 0}
 
         if res['rc'] != 0:
-            self.m.fail_json(msg=self.log_dic)
+            self.m.fail_json(msg=self.log_dic, summary=self.summary)
 
 
     def _setup_creds(self):
         for k,v in self.m.params.items():
             setattr(self, k, v)
-        self.commands = {
-            'check':   '%s %s --list-keys %s',
+        self.templates = {
+            'check':   '%s %s --with-colons --fixed-list-mode --with-fingerprint --list-keys %s',
             'delete':  '%s %s --batch --yes --delete-keys %s',
             'refresh': '%s %s --keyserver %%s --keyserver-options timeout=%%d --refresh-keys %s',
             'recv':    '%s %s --keyserver %%s --keyserver-options timeout=%%d --recv-keys %s'
         }
-        bp = self.m.get_bin_path('gpg', True)
-        check_mode = '--dry-run' if self.m.check_mode else ''
-        for c,l in self.commands.items():
-            self.commands[c] = l % (bp, check_mode, self.key_id)
+        self.bp = self.m.get_bin_path('gpg', True)
+        self.check_mode = '--dry-run' if self.m.check_mode else ''
+        self._format_commands(self.key_id)
+        # --with-fingerprint given twice also prints subkey fingerprints, which the index
+        # needs, and unlike --with-subkey-fingerprint it works with gpg 1.4 as well
+        self.commands['list'] = '%s --with-colons --fixed-list-mode --with-fingerprint ' \
+                                '--with-fingerprint --list-keys' % self.bp
+        self.import_command = '%s %s --batch --import' % (self.bp, self.check_mode)
+        self.hex_id = re.sub(r'^0x|\s', '', self.key_id).upper()
+        self.is_hex = re.match('^([0-9A-F]{8}|[0-9A-F]{16}|[0-9A-F]{40})$', self.hex_id) is not None
+        if self.fetch == 'hkp' and not self.is_hex:
+            self.fetch = 'gpg'
         self.urls = [s if re.match('hkps?://', s)
                        else 'hkp://%s' % s
                      for s in self.servers]
+        self.cache_dir = os.path.expanduser(self.cache_dir)
+        self.scoreboard = ServerScoreboard(
+            os.path.join(self.cache_dir, 'keyservers.json'), self.delay)
+        self.key_cache = KeyCache(os.path.join(self.cache_dir, 'keys'), self.cache_ttl)
+        self.hkp = HkpClient(self.gpg_timeout)
+        self.refreshed_file = os.path.join(self.cache_dir, 'refreshed.json')
+
+    def _format_commands(self, target):
+        """(re)build the commands for `target`, the key id or the fingerprints it resolved to"""
+        commands = getattr(self, 'commands', {})
+        for c,l in self.templates.items():
+            commands[c] = l % (self.bp, self.check_mode, target)
+        self.commands = commands
+
+    def _last_refreshed(self):
+        try:
+            with open(self.refreshed_file) as f:
+                return json.load(f)
+        except (IOError, OSError, ValueError):
+            return {}
+
+    def _is_stale(self, keys):
+        """whether any of `keys` is due for a refresh"""
+        now = time()
+        last = self._last_refreshed()
+        for k in keys:
+            # imports are recorded under the long key id gpg reported
+            refreshed = max(last.get(k['fpr'] or k['keyid'], 0), last.get(k['keyid'][-16:], 0))
+            if now - refreshed > self.max_age:
+                return True
+            for e in [k] + k['subkeys']:
+                # revoked and already expired subkeys (e.g. rotated ones) have nothing left to refresh
+                if e['validity'] in ('r', 'e') or not e['expires'] or e['expires'] <= now:
+                    continue
+                if e['expires'] - now < self.expiry_margin:
+                    return True
+        return False
+
+    def _imported_ids(self, res):
+        """long key ids (or fingerprints) of the keys gpg reported as imported"""
+        return sorted(set(i.upper() for i in
+                          re.findall(r'gpg: key (?:0x)?([0-9A-Fa-f]{40}|[0-9A-Fa-f]{16}):', res['stderr'])))
+
+    def _mark_refreshed(self, ids):
+        if self.m.check_mode or not ids:
+            return
+        last = self._last_refreshed()
+        for i in ids:
+            last[i] = int(time())
+        try:
+            if not os.path.isdir(self.cache_dir):
+                os.makedirs(self.cache_dir, 0o700)
+            tmp = '%s.%d' % (self.refreshed_file, os.getpid())
+            with open(tmp, 'w') as f:
+                json.dump(last, f)
+            os.rename(tmp, self.refreshed_file)
+        except (IOError, OSError):
+            pass
+
+    def _cached_import(self, cmd):
+        """import the key from the local cache, if it is there and fresh"""
+        if self.fetch != 'hkp':
+            return None
+        armored = self.key_cache.get(self.hex_id)
+        if armored is None:
+            return None
+        # the cache may be shared between machines, trust it no more than a keyserver
+        try:
+            fprs = fingerprints(dearmor(armored))
+        except (ValueError, TypeError, IndexError, struct.error):
+            fprs = []
+        if not any(f.endswith(self.hex_id) for f in fprs):
+            if not self.m.check_mode:
+                self.key_cache.drop(self.hex_id)
+            return None
+        start = time()
+        raw_res = self.m.run_command(self.import_command, data=armored)
+        res = self._legiblify(cmd, raw_res, 'cache', time() - start)
+        return res if res['rc'] == 0 else None
+
+    def _hkp_import(self, url):
+        """fetch the key from `url` and import it
+
+        Returns a run_command style tuple and whether the server is healthy."""
+        try:
+            armored = self.hkp.get(url, self.hex_id)
+            fprs = fingerprints(dearmor(armored))
+        except HkpError as e:
+            # a 404 is the answer for a key the server does not have, only server errors
+            # and rate limiting are reasons to back off
+            return (1, '', 'hkp: %s' % e), e.status < 500 and e.status != 429
+        except (httplib.HTTPException, IOError, OSError, ValueError, TypeError) as e:
+            return (1, '', 'hkp: %s' % e), False
+        # never import whatever else a keyserver may have handed out
+        if not any(f.endswith(self.hex_id) for f in fprs):
+            return (1, '', 'hkp: %s returned no key matching %s' % (url, self.key_id)), False
+        res = self.m.run_command(self.import_command, data=armored)
+        if res[0] == 0 and not self.m.check_mode:
+            self.key_cache.put(self.hex_id, fprs[0], armored)
+        return res, True
 
     def _repeat_command(self, cmd):
-        for n in range(self.tries):
-            for u in self.urls:
-                args = (u, self.gpg_timeout)
-                raw_res = self.m.run_command(self.commands[cmd] % args)
-                res = self._legiblify(cmd, raw_res)
-                if res['rc'] == 0:
-                    return res
-                sleep(self.delay)
-        return {'rc': 8888}
+        try:
+            for n in range(self.tries):
+                urls = self.scoreboard.order(self.urls)
+                ready = [u for u in urls if self.scoreboard.cooldown(u) == 0]
+                if not ready:
+                    # everything is cooling down, wait for the first one to come back,
+                    # but never longer than the backoff of this round
+                    u = min(urls, key=self.scoreboard.cooldown)
+                    sleep(min(self.scoreboard.cooldown(u), self.scoreboard.backoff(n + 1)))
+                    ready = [u]
+                for u in ready:
+                    args = (u, self.gpg_timeout)
+                    start = time()
+                    if self.fetch == 'hkp':
+                        raw_res, healthy = self._hkp_import(u)
+                    else:
+                        raw_res = self.m.run_command(self.commands[cmd] % args)
+                        # gpg reports a key the server does not have as no data (1.4: not found)
+                        healthy = raw_res[0] == 0 or \
+                            re.search(r'receive failed: No data|not found on keyserver', raw_res[2]) is not None
+                    elapsed = time() - start
+                    res = self._legiblify(cmd, raw_res, u, elapsed)
+                    # a key id the servers do not know must not put them on a cooldown
+                    self.scoreboard.record(u, healthy, elapsed)
+                    if res['rc'] == 0:
+                        return res
+            return {'rc': 8888, 'stdout': '', 'stderr': ''}
+        finally:
+            if not self.m.check_mode:
+                self.scoreboard.save()
 
     def _execute_command(self, cmd):
+        start = time()
         raw_res = self.m.run_command(self.commands[cmd])
-        return self._legiblify(cmd, raw_res)
+        return self._legiblify(cmd, raw_res, None, time() - start)
+
+    def _truncate(self, out):
+        if len(out) <= self.log_size:
+            return out
+        return '[%d chars cut]...%s' % (len(out) - self.log_size, out[len(out) - self.log_size:])
 
-    def _legiblify(self, sec, res):
-        """turn tuple to dict and preserve it for debugging"""
+    def _legiblify(self, sec, res, url, duration):
+        """turn tuple to dict and preserve a bounded, truncated copy of it for debugging"""
         if not hasattr(self, 'log_dic'):
             self.log_dic = {}
+            self.summary = {}
         rdic = dict([k, res[i]] for i,k in enumerate(('rc', 'stdout', 'stderr')))
-        self.log_dic.setdefault(sec, {'tries': [], 'num_tries':  0})
-        self.log_dic[sec]['tries'].append(rdic)
-        self.log_dic[sec]['num_tries'] += 1
+        entry = {'rc': rdic['rc'], 'duration': round(duration, 3)}
+        if url:
+            entry['server'] = url
+        for k in ('stdout', 'stderr'):
+            if rdic[k]:
+                entry[k] = self._truncate(rdic[k])
+        log = self.log_dic.setdefault(sec, {'tries': [], 'num_tries':  0})
+        log['tries'] = (log['tries'] + [entry])[-self.log_tries:] if self.log_tries > 0 else []
+        log['num_tries'] += 1
+        summary = self.summary.setdefault(sec, {'duration': 0, 'num_tries': 0, 'server': None})
+        summary['duration'] = round(summary['duration'] + duration, 3)
+        summary['num_tries'] += 1
+        if rdic['rc'] == 0:
+            summary['server'] = url
         return rdic
 
 
@@ -150,9 +661,16 @@ def main():
             key_id=dict(required=True, type='str'),
             servers=dict(default=['keys.gnupg.org'], type='list'),
             tries=dict(default=3, type='int'),
-            delay=dict(default=0.5),
+            delay=dict(default=0.5, type='float'),
             state=dict(default='present', choices=['latest', 'refreshed', 'absent', 'present']),
-            gpg_timeout=dict(default=5, type='int')
+            gpg_timeout=dict(default=5, type='int'),
+            cache_dir=dict(default='~/.cache/gpg_import', type='str'),
+            fetch=dict(default='gpg', choices=['gpg', 'hkp']),
+            max_age=dict(default=86400, type='int'),
+            expiry_margin=dict(default=2592000, type='int'),
+            cache_ttl=dict(default=604800, type='int'),
+            log_size=dict(default=512, type='int'),
+            log_tries=dict(default=5, type='int')
         ),
         supports_check_mode=True
     )
@@ -160,6 +678,7 @@ def main():
     gkm = GpgImport(module)
 
     result = {'log_dic': gkm.log_dic,
+              'summary': gkm.summary,
               'changed': gkm.changed}
 
     module.exit_json(**result)
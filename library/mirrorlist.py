@@ -0,0 +1,297 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+from time import gmtime, strftime, time
+import json
+import os
+import re
+import threading
+
+try:
+    from Queue import Queue, Empty
+    from urllib2 import urlopen
+    from httplib import HTTPException
+except ImportError:
+    from queue import Queue, Empty
+    from urllib.request import urlopen
+    from http.client import HTTPException
+
+DOCUMENTATION = '''
+---
+module: mirrorlist
+short_description: Writes a pacman mirrorlist ranked by measured throughput
+description:
+     - Probes the candidate mirrors concurrently for latency (time to the first byte of their
+       C(lastsync) file), sync freshness (its content) and sustained throughput (downloading
+       C(sample) from C(repo)), then writes the up-to-date ones that deliver the sample fastest
+       (latency plus transfer time) to C(dest).
+     - Probe results are cached in C(cache_path) and reused for C(cache_ttl) seconds while the
+       candidates stay the same, so plays do not probe on every run.
+options:
+  src:
+    description:
+      - A mirrorlist with the candidates. Commented out C(Server) lines are candidates as well.
+    required: true
+
+  dest:
+    description:
+      - The mirrorlist to write.
+    required: false
+    default: "/etc/pacman.d/mirrorlist"
+
+  count:
+    description:
+      - Number of mirrors to write.
+    required: false
+    default: 10
+
+  repo:
+    description:
+      - Repository to take the sample from.
+    required: false
+    default: "core"
+
+  arch:
+    description:
+      - Architecture substituted for C($arch).
+    required: false
+    default: "x86_64"
+
+  sample:
+    description:
+      - File in C($repo/os/$arch) downloaded to measure throughput. C($repo) is substituted.
+    required: false
+    default: "$repo.db"
+
+  max_lag:
+    description:
+      - Mirrors that synced more than this many seconds before the freshest one are dropped.
+    required: false
+    default: 86400
+
+  timeout:
+    description:
+      - Timeout per request in seconds.
+    required: false
+    default: 5
+
+  workers:
+    description:
+      - Number of mirrors probed at the same time.
+    required: false
+    default: 8
+
+  cache_path:
+    description:
+      - File to cache probe results in.
+    required: false
+    default: "/var/cache/mirrorlist/probe.json"
+
+  cache_ttl:
+    description:
+      - Seconds probe results are reused.
+    required: false
+    default: 86400
+
+notes: []
+requirements: []
+'''
+
+EXAMPLES = '''
+- copy: src=../setup-files/pacman.mirrorlist dest=/etc/pacman.d/mirrorlist.candidates
+- mirrorlist: src=/etc/pacman.d/mirrorlist.candidates dest=/etc/pacman.d/mirrorlist count=8
+'''
+
+
+def parse_candidates(text):
+    """server urls of a mirrorlist, including commented out ones, in order"""
+    servers = []
+    for line in text.splitlines():
+        m = re.match(r'^\s*#*\s*Server\s*=\s*(\S+)', line)
+        if m and m.group(1) not in servers:
+            servers.append(m.group(1))
+    return servers
+
+
+class Prober(object):
+
+    def __init__(self, repo, arch, sample, timeout):
+        self.repo = repo
+        self.arch = arch
+        self.sample = sample.replace('$repo', repo)
+        self.timeout = timeout
+
+    def probe(self, server):
+        """latency, last sync and throughput of one mirror"""
+        res = {'server': server}
+        root = server.split('$repo')[0]
+        base = server.replace('$repo', self.repo).replace('$arch', self.arch).rstrip('/')
+        try:
+            start = time()
+            resp = urlopen(root + 'lastsync', timeout=self.timeout)
+            res['latency'] = time() - start
+            res['lastsync'] = int(resp.read().strip() or 0)
+        except (IOError, OSError, ValueError, HTTPException) as e:
+            res['error'] = 'lastsync: %s' % e
+            return res
+        try:
+            resp = urlopen('%s/%s' % (base, self.sample), timeout=self.timeout)
+            start = time()
+            size = 0
+            while True:
+                chunk = resp.read(65536)
+                if not chunk:
+                    break
+                size += len(chunk)
+            if not size:
+                raise IOError('empty sample')
+            res['size'] = size
+            res['throughput'] = size / max(time() - start, 1e-6)
+        except (IOError, OSError, HTTPException) as e:
+            res['error'] = 'sample: %s' % e
+        return res
+
+    def probe_all(self, servers, workers):
+        queue = Queue()
+        for s in servers:
+            queue.put(s)
+        results = {}
+
+        def work():
+            while True:
+                try:
+                    s = queue.get_nowait()
+                except Empty:
+                    return
+                try:
+                    results[s] = self.probe(s)
+                except Exception as e:
+                    # one misbehaving mirror must not take the others down with it
+                    results[s] = {'server': s, 'error': 'probe: %r' % e}
+
+        threads = [threading.Thread(target=work) for n in range(min(workers, len(servers)))]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return [results[s] for s in servers]
+
+
+def rank(results, max_lag):
+    """usable mirrors, by the time they take to answer and then deliver the sample"""
+    ok = [r for r in results if 'error' not in r]
+    if not ok:
+        return []
+    newest = max(r['lastsync'] for r in ok)
+    fresh = [r for r in ok if newest - r['lastsync'] <= max_lag]
+    return sorted(fresh, key=lambda r: r['latency'] + r['size'] / r['throughput'])
+
+
+def render(ranked, probed):
+    lines = ['##',
+             '## Arch Linux repository mirrorlist',
+             '## Ranked by measured latency and throughput',
+             '## Probed on %s' % strftime('%Y-%m-%d %H:%M', gmtime(probed)),
+             '##',
+             '']
+    for r in ranked:
+        lines.append('## %.1f KiB/s, %d ms, synced %s' % (r['throughput'] / 1024, r['latency'] * 1000,
+                                                          strftime('%Y-%m-%d %H:%M', gmtime(r['lastsync']))))
+        lines.append('Server = %s' % r['server'])
+    return '\n'.join(lines) + '\n'
+
+
+class Mirrorlist(object):
+
+    def __init__(self, module):
+        self.m = module
+        for k,v in self.m.params.items():
+            setattr(self, k, v)
+
+    def _load_cache(self, servers):
+        try:
+            with open(self.cache_path) as f:
+                cache = json.load(f)
+        except (IOError, OSError, ValueError):
+            return None
+        if cache.get('servers') != servers or time() - cache.get('probed', 0) > self.cache_ttl:
+            return None
+        return cache
+
+    def _save_cache(self, cache):
+        try:
+            d = os.path.dirname(self.cache_path)
+            if not os.path.isdir(d):
+                os.makedirs(d, 0o755)
+            tmp = '%s.%d' % (self.cache_path, os.getpid())
+            with open(tmp, 'w') as f:
+                json.dump(cache, f)
+            os.rename(tmp, self.cache_path)
+        except (IOError, OSError):
+            pass
+
+    def run(self):
+        try:
+            with open(self.src) as f:
+                servers = parse_candidates(f.read())
+        except (IOError, OSError) as e:
+            self.m.fail_json(msg='could not read %s: %s' % (self.src, e))
+
+        cache = self._load_cache(servers)
+        cached = cache is not None
+        if not cached:
+            prober = Prober(self.repo, self.arch, self.sample, self.timeout)
+            cache = {'servers': servers, 'probed': time(),
+                     'results': prober.probe_all(servers, self.workers)}
+            if not self.m.check_mode:
+                self._save_cache(cache)
+
+        ranked = rank(cache['results'], self.max_lag)[:self.count]
+        if not ranked:
+            self.m.fail_json(msg='no usable mirror among %d candidates' % len(servers),
+                             results=cache['results'])
+
+        content = render(ranked, cache['probed'])
+        try:
+            with open(self.dest) as f:
+                changed = f.read() != content
+        except (IOError, OSError):
+            changed = True
+        if changed and not self.m.check_mode:
+            tmp = '%s.%d' % (self.dest, os.getpid())
+            with open(tmp, 'w') as f:
+                f.write(content)
+            os.chmod(tmp, 0o644)
+            os.rename(tmp, self.dest)
+
+        return {'changed': changed,
+                'cached': cached,
+                'mirrors': [r['server'] for r in ranked],
+                'results': cache['results']}
+
+
+def main():
+    module = AnsibleModule(
+        argument_spec = dict(
+            src=dict(required=True, type='str'),
+            dest=dict(default='/etc/pacman.d/mirrorlist', type='str'),
+            count=dict(default=10, type='int'),
+            repo=dict(default='core', type='str'),
+            arch=dict(default='x86_64', type='str'),
+            sample=dict(default='$repo.db', type='str'),
+            max_lag=dict(default=86400, type='int'),
+            timeout=dict(default=5, type='float'),
+            workers=dict(default=8, type='int'),
+            cache_path=dict(default='/var/cache/mirrorlist/probe.json', type='str'),
+            cache_ttl=dict(default=86400, type='int')
+        ),
+        supports_check_mode=True
+    )
+
+    result = Mirrorlist(module).run()
+
+    module.exit_json(**result)
+
+
+from ansible.module_utils.basic import *
+main()
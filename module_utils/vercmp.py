@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""pacman's version comparison, shared by the modules in library/
+
+Modules import it as ansible.module_utils.vercmp. Like library/, ansible picks
+up this directory next to the playbooks and ships it with the modules that
+import from it."""
+
+import re
+
+
+def rpmvercmp(a, b):
+    """python version of alpm's rpmvercmp()"""
+    if a == b:
+        return 0
+
+    i = j = 0
+    while i < len(a) and j < len(b):
+        si, sj = i, j
+        while i < len(a) and not a[i].isalnum():
+            i += 1
+        while j < len(b) and not b[j].isalnum():
+            j += 1
+
+        if i >= len(a) or j >= len(b):
+            break
+
+        if i - si != j - sj:
+            return -1 if i - si < j - sj else 1
+
+        isnum = a[i].isdigit()
+        pattern = r'[0-9]*' if isnum else r'[a-zA-Z]*'
+        seg_a = re.match(pattern, a[i:]).group()
+        seg_b = re.match(pattern, b[j:]).group()
+        i += len(seg_a)
+        j += len(seg_b)
+
+        if not seg_b:
+            return 1 if isnum else -1
+
+        if isnum:
+            seg_a = seg_a.lstrip('0')
+            seg_b = seg_b.lstrip('0')
+            if len(seg_a) != len(seg_b):
+                return 1 if len(seg_a) > len(seg_b) else -1
+
+        if seg_a != seg_b:
+            return 1 if seg_a > seg_b else -1
+
+    if i >= len(a) and j >= len(b):
+        return 0
+
+    # a remaining alpha segment never beats an empty string
+    if (i >= len(a) and not b[j].isalpha()) or (i < len(a) and a[i].isalpha()):
+        return -1
+    return 1
+
+
+def vercmp(a, b):
+    def evr(v):
+        epoch, _, rest = v.partition(':') if re.match(r'^\d+:', v) else ('0', '', v)
+        version, _, release = rest.rpartition('-') if '-' in rest else (rest, '', None)
+        return epoch, version, release
+
+    ea, va, ra = evr(a)
+    eb, vb, rb = evr(b)
+    return rpmvercmp(ea, eb) or rpmvercmp(va, vb) or (rpmvercmp(ra, rb) if ra and rb else 0)
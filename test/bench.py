@@ -0,0 +1,526 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Subprocess, network and wall time budgets for the modules in library/.
+
+Every scenario runs modules in a fresh Sandbox and is measured by what the
+module spent: run_command() calls, requests to the local stand-ins and wall
+time. Subprocess and request budgets are exact, they only change when the
+modules change how often they shell out or go to the network. Wall time
+budgets are generous, so they only trip on real regressions (say a dead
+keyserver waited for on every key) and not on a slow machine.
+
+    python3 test/bench.py               # all scenarios
+    python3 test/bench.py gpg-import    # those whose name contains gpg-import
+
+Exits non-zero if any scenario fails or goes over budget.
+"""
+
+import json
+import os
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pgp
+from harness import HERE, Sandbox
+from standins import AurRpc, Blackhole, Keyserver, Malformed, Mirror, StandIn
+
+SCENARIOS = []
+
+
+class ScenarioError(Exception):
+    pass
+
+
+class Budget(object):
+
+    def __init__(self, subprocesses, requests, wall):
+        self.subprocesses = subprocesses
+        self.requests = requests
+        self.wall = wall
+
+
+class Meter(object):
+    """the module runs that count towards a scenario's budget"""
+
+    def __init__(self, box):
+        self.box = box
+        self.runs = []
+        self.requests = 0
+
+    def run(self, name, params, standins=(), check_mode=False, fails=False):
+        before = sum(s.requests for s in standins)
+        run = self.box.run(name, params, check_mode)
+        self.requests += sum(s.requests for s in standins) - before
+        self.runs.append(run)
+        if run.failed != fails:
+            raise ScenarioError('%s %s: %s' % (name, 'failed' if run.failed else 'did not fail',
+                                               run.result.get('msg')))
+        return run
+
+    @property
+    def subprocesses(self):
+        return sum(r.subprocesses for r in self.runs)
+
+    @property
+    def wall(self):
+        return sum(r.wall for r in self.runs)
+
+    @property
+    def tools(self):
+        counts = {}
+        for r in self.runs:
+            for tool, n in r.tools.items():
+                counts[tool] = counts.get(tool, 0) + n
+        return counts
+
+
+def check(condition, msg):
+    if not condition:
+        raise ScenarioError(msg)
+
+
+def scenario(subprocesses, requests, wall):
+    def register(fn):
+        fn.name = fn.__name__.replace('_', '-')
+        fn.budget = Budget(subprocesses, requests, wall)
+        SCENARIOS.append(fn)
+        return fn
+    return register
+
+
+class Report(object):
+
+    def __init__(self, scenario, meter=None, error=None):
+        self.scenario = scenario
+        self.meter = meter
+        self.error = error
+
+    @property
+    def problems(self):
+        if self.error:
+            return [self.error]
+        b = self.scenario.budget
+        m = self.meter
+        problems = []
+        if m.subprocesses > b.subprocesses:
+            problems.append('%d subprocesses, budget %d' % (m.subprocesses, b.subprocesses))
+        if m.requests > b.requests:
+            problems.append('%d requests, budget %d' % (m.requests, b.requests))
+        if m.wall > b.wall:
+            problems.append('%.2fs wall time, budget %.2fs' % (m.wall, b.wall))
+        return problems
+
+    @property
+    def ok(self):
+        return not self.problems
+
+
+def execute(fn):
+    """run one scenario in a fresh sandbox, returns its Report"""
+    with Sandbox() as box:
+        meter = Meter(box)
+        try:
+            fn(box, meter)
+        except ScenarioError as e:
+            return Report(fn, meter, str(e))
+    return Report(fn, meter)
+
+
+# -- packer -------------------------------------------------------------------
+
+AUR_NAMES = ['aur-pkg-%03d' % i for i in range(200)]
+
+
+@scenario(subprocesses=202, requests=0, wall=20)
+def packer_200_installed(box, meter):
+    """nothing to do: which packer, which pacman and one pacman -Q per package"""
+    box.installed(AUR_NAMES)
+    run = meter.run('packer', {'name': ','.join(AUR_NAMES)})
+    check(not run.result['changed'], 'reported a change with everything installed')
+
+
+@scenario(subprocesses=221, requests=0, wall=20)
+def packer_10_missing(box, meter):
+    """10 of 200 to build, each but the first is checked again after the builds before it"""
+    box.installed(AUR_NAMES[10:])
+    run = meter.run('packer', {'name': ','.join(AUR_NAMES), 'build_profile': 'fast'})
+    check(run.result['changed'], 'reported no change with 10 packages missing')
+    check(run.tools.get('packer') == 10, 'ran packer %s times for 10 packages' % run.tools.get('packer'))
+    missing = set(AUR_NAMES) - set(box.local_db())
+    check(not missing, '%d packages still missing' % len(missing))
+
+
+@scenario(subprocesses=11, requests=0, wall=10)
+def packer_resolve_deps(box, meter):
+    """pacaur -> cower, from .SRCINFO fixtures, with expac and yajl from the repos"""
+    box.installed(['git', 'sudo', 'curl', 'openssl', 'perl'])
+    box.in_sync_db(['git', 'sudo', 'curl', 'openssl', 'perl', 'expac', 'yajl'])
+    run = meter.run('packer', {'name': 'pacaur', 'resolve_deps': 'yes',
+                               'srcinfo_dir': os.path.join(HERE, 'fixtures', 'srcinfo')})
+    check(run.result['build_plan'] == ['cower', 'pacaur'], 'build plan %s' % run.result['build_plan'])
+    check(run.result['repo_deps'] == ['expac', 'yajl'], 'repo deps %s' % run.result['repo_deps'])
+    check(run.tools.get('packer') == 2, 'ran packer %s times for 2 packages' % run.tools.get('packer'))
+
+
+def _aur_push(box, pkgbase, pkgver, depends=(), srcinfo=True):
+    """commit a .SRCINFO for `pkgbase` at `pkgver` to its repository under box/aur
+
+    Without `srcinfo` only a PKGBUILD is committed, like a maintainer who forgot it."""
+    bare = box.path('aur', '%s.git' % pkgbase)
+    work = box.path('aur-work', pkgbase)
+    env = dict(os.environ, HOME=box.home, GIT_AUTHOR_NAME='aur', GIT_AUTHOR_EMAIL='aur@example.org',
+               GIT_COMMITTER_NAME='aur', GIT_COMMITTER_EMAIL='aur@example.org')
+
+    def git(*args):
+        subprocess.check_call(('git',) + args, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    if not os.path.isdir(bare):
+        git('init', '-q', '--bare', bare)
+        git('-C', bare, 'symbolic-ref', 'HEAD', 'refs/heads/master')
+        git('init', '-q', work)
+    if srcinfo:
+        fn, content = '.SRCINFO', 'pkgbase = %s\n\tpkgver = %s\n\tpkgrel = 1\n\tarch = any\n%s\npkgname = %s\n' \
+            % (pkgbase, pkgver, ''.join('\tdepends = %s\n' % d for d in depends), pkgbase)
+    else:
+        fn, content = 'PKGBUILD', 'pkgname=%s\npkgver=%s\npkgrel=1\n' % (pkgbase, pkgver)
+    with open(os.path.join(work, fn), 'w') as f:
+        f.write(content)
+    git('-C', work, 'add', fn)
+    git('-C', work, 'commit', '-q', '-m', '%s %s' % (pkgbase, pkgver))
+    git('-C', work, 'push', '-q', bare, 'HEAD:refs/heads/master')
+
+
+@scenario(subprocesses=20, requests=0, wall=10)
+def packer_clone_dir(box, meter):
+    """makepkg in shallow clones of local AUR repositories, AUR dependencies first, then an update"""
+    _aur_push(box, 'foo', '1.0')
+    _aur_push(box, 'bar', '1.0', depends=['baz>=1.0'])
+    _aur_push(box, 'baz', '1.0')
+    params = {'name': 'foo,bar', 'clone_dir': box.path('clones'), 'aur_url': 'file://' + box.path('aur')}
+    first = meter.run('packer', params)
+    check(first.result['build_plan'] == ['baz', 'foo', 'bar'], 'build plan %s' % first.result['build_plan'])
+    check(first.tools.get('makepkg') == 3, 'ran makepkg %s times for 3 packages' % first.tools.get('makepkg'))
+
+    _aur_push(box, 'foo', '1.1')
+    box.forget(['foo'])
+    second = meter.run('packer', params)
+    check(any('fetch --depth 1' in c for c in second.calls), 'the existing clone was not updated')
+    check(box.local_db() == {'foo': '1.1-1', 'bar': '1.0-1', 'baz': '1.0-1'}, 'installed %s' % box.local_db())
+    commits = subprocess.check_output(['git', '-C', box.path('clones', 'foo'), 'rev-list', '--count', 'HEAD'])
+    check(int(commits) == 1, 'clone holds %d commits, expected a shallow one' % int(commits))
+
+
+@scenario(subprocesses=5, requests=1, wall=10)
+def packer_clone_dir_failures(box, meter):
+    """no pkgbase guesses against a failing AUR RPC, a clone without .SRCINFO fails cleanly"""
+    with StandIn() as aur:
+        run = meter.run('packer', {'name': 'foo', 'clone_dir': box.path('clones'), 'aur_url': aur.url},
+                        [aur], fails=True)
+    check(run.result['msg'].startswith('failed to look up foo in the AUR'), run.result['msg'])
+    check(not any('clone' in c for c in run.calls), 'cloned without knowing the pkgbase: %s' % run.calls)
+
+    _aur_push(box, 'foo', '1.0', srcinfo=False)
+    run = meter.run('packer', {'name': 'foo', 'clone_dir': box.path('clones'),
+                               'aur_url': 'file://' + box.path('aur')}, fails=True)
+    check(run.result['msg'].startswith('failed to read the .SRCINFO of foo'), run.result['msg'])
+
+
+@scenario(subprocesses=18, requests=1, wall=10)
+def packer_repo_publish_then_prebuilt(box, meter):
+    """builds are published to a repository, another host installs them from there"""
+    repo = box.path('repo')
+    os.makedirs(repo)
+    with AurRpc({'foo': '1.0-1', 'bar': '1.0-1', 'baz': '1.1-1'}) as aur:
+        params = {'name': 'foo,bar,baz', 'repo_dir': repo, 'aur_url': aur.url}
+        first = meter.run('packer', params, [aur])
+        published = first.result['repo']['published']
+        check(len(published) == 3 and first.tools.get('repo-add') == 1,
+              'published %s with %s repo-add runs' % (published, first.tools.get('repo-add')))
+
+        # a fresh host: foo and bar are current in the repository, the AUR has a newer baz
+        box.forget(['foo', 'bar', 'baz'])
+        second = meter.run('packer', params, [aur])
+    check(second.result['repo']['prebuilt'] == ['foo', 'bar'], 'prebuilt %s' % second.result['repo']['prebuilt'])
+    check(second.tools.get('packer') == 1, 'ran packer %s times, only baz needs a build'
+          % second.tools.get('packer'))
+    check(sum(c.startswith('pacman -U') for c in second.calls) == 1, 'prebuilt packages not in one transaction')
+    check(sorted(box.local_db()) == ['bar', 'baz', 'foo'], 'installed %s' % sorted(box.local_db()))
+
+
+@scenario(subprocesses=20, requests=1, wall=10)
+def packer_repo_publish_after_failure(box, meter):
+    """builds before a failed one are published, as are packages an earlier run left unpublished"""
+    repo = box.path('repo')
+    os.makedirs(repo)
+    # built by a run that was killed before repo-add
+    open(os.path.join(repo, 'qux-1.0-1-x86_64.pkg.tar.zst'), 'w').close()
+    with AurRpc({'foo': '1.0-1', 'bar': '1.0-1', 'baz': '1.0-1', 'qux': '1.0-1'}) as aur:
+        params = {'name': 'foo,bar,baz', 'repo_dir': repo, 'aur_url': aur.url}
+        box.env['FAKE_PACKER_FAIL'] = 'baz'
+        failed = meter.run('packer', params, [aur], fails=True)
+        del box.env['FAKE_PACKER_FAIL']
+        check(failed.result['msg'].startswith('failed to install package baz'), failed.result['msg'])
+
+        # a fresh host gets all of them but baz from the repository
+        box.forget(['foo', 'bar'])
+        second = meter.run('packer', dict(params, name='foo,bar,baz,qux'), [aur])
+    check(second.result['repo']['prebuilt'] == ['foo', 'bar', 'qux'], 'prebuilt %s' % second.result['repo']['prebuilt'])
+    check(second.tools.get('packer') == 1, 'ran packer %s times, only baz needs a build'
+          % second.tools.get('packer'))
+
+
+@scenario(subprocesses=26, requests=0, wall=10)
+def packer_compile_cache(box, meter):
+    """misses on the first build, hits on the rebuild, no counts from a ccache without stats"""
+    params = {'name': 'foo,bar', 'compile_cache': 'yes', 'compile_cache_dir': box.path('ccache')}
+    first = meter.run('packer', params)
+    env = first.result['build_env']
+    check(env['PATH'].startswith('/usr/lib/ccache/bin:') and env['CCACHE_DIR'] == box.path('ccache'),
+          'build env %s' % env)
+    check((first.result['compile_cache']['hits'], first.result['compile_cache']['misses']) == (0, 2),
+          'first build %s' % first.result['compile_cache'])
+
+    box.forget(['foo', 'bar'])
+    second = meter.run('packer', params)
+    check((second.result['compile_cache']['hits'], second.result['compile_cache']['misses']) == (2, 0),
+          'rebuild %s' % second.result['compile_cache'])
+
+    box.forget(['foo', 'bar'])
+    box.env['FAKE_CCACHE_OLD'] = '1'
+    third = meter.run('packer', params)
+    check((third.result['compile_cache']['hits'], third.result['compile_cache']['misses']) == (None, None),
+          'unreadable stats reported as %s' % third.result['compile_cache'])
+
+
+# -- gpg_import ---------------------------------------------------------------
+
+KEYS = dict(pgp.make_key(i) for i in range(10))
+
+
+def _import_keys(box, meter, fetch):
+    with Keyserver(KEYS) as live, Blackhole() as dead:
+        for fpr in sorted(KEYS):
+            # the dead server is listed first, only the first key should wait for it
+            meter.run('gpg_import', {'key_id': fpr[-16:], 'servers': [dead.hkp_url, live.hkp_url],
+                                     'fetch': fetch, 'gpg_timeout': 1, 'delay': 60,
+                                     'cache_dir': box.path('gpg_import')},
+                      [live, dead])
+        check(dead.requests == 1, 'dead keyserver was tried %d times' % dead.requests)
+    with open(os.path.join(box.gnupghome, 'fake-keyring.json')) as f:
+        check(set(json.load(f)) == set(KEYS), 'not all keys ended up in the keyring')
+
+
+@scenario(subprocesses=21, requests=11, wall=8)
+def gpg_import_10_keys_dead_server(box, meter):
+    """gpg --recv-keys per key, one listing each, the dead server only once"""
+    _import_keys(box, meter, 'gpg')
+
+
+@scenario(subprocesses=20, requests=11, wall=8)
+def gpg_import_10_keys_dead_server_hkp(box, meter):
+    """built in HKP client, the dead server costs one connection and one timeout"""
+    _import_keys(box, meter, 'hkp')
+
+
+@scenario(subprocesses=8, requests=7, wall=5)
+def gpg_import_unknown_key(box, meter):
+    """a key id the keyserver does not have puts no cooldown on it, the next key does not wait"""
+    fpr = sorted(KEYS)[0]
+    with Keyserver(KEYS) as live:
+        for fetch in ('gpg', 'hkp'):
+            params = {'servers': [live.hkp_url], 'fetch': fetch, 'delay': 60,
+                      'cache_dir': box.path('gpg_import-%s' % fetch)}
+            meter.run('gpg_import', dict(params, key_id='0123456789ABCDEF'), [live], fails=True)
+            meter.run('gpg_import', dict(params, key_id=fpr), [live])
+            with open(box.path('gpg_import-%s' % fetch, 'keyservers.json')) as f:
+                entry = json.load(f)['servers'][live.hkp_url]
+            check(entry['failures'] == 0 and not entry['cooldown_until'],
+                  '%s: the unknown key counted as a server failure: %s' % (fetch, entry))
+
+
+@scenario(subprocesses=1, requests=0, wall=5)
+def gpg_import_latest_steady(box, meter):
+    """a key refreshed recently: one keyring listing, no keyserver"""
+    fpr = sorted(KEYS)[0]
+    with Keyserver(KEYS) as live:
+        params = {'key_id': fpr, 'state': 'latest', 'servers': [live.hkp_url],
+                  'cache_dir': box.path('gpg_import')}
+        box.run('gpg_import', params)
+        run = meter.run('gpg_import', params, [live])
+    check(not run.result['changed'], 'reported a change for a fresh key')
+
+
+# fingerprint -> seed, to make the same keys with another user id
+SUBKEY_SEEDS = dict((pgp.make_key(seed)[0], seed) for seed in (20, 21, 22))
+SUBKEY_KEYS = dict(pgp.make_key(seed, subkeys=2) for seed in SUBKEY_SEEDS.values())
+
+
+def _import_subkey_keys(box, live, state):
+    params = {'state': state, 'servers': [live.hkp_url], 'cache_dir': box.path('gpg_import')}
+    for fpr in sorted(SUBKEY_KEYS):
+        box.run('gpg_import', dict(params, key_id=fpr))
+    return params
+
+
+@scenario(subprocesses=5, requests=0, wall=5)
+def gpg_import_subkey_and_short_ids(box, meter):
+    """keys found in the one keyring listing by subkey ids and short ids, deleted by their primary"""
+    k0, k1, k2 = sorted(SUBKEY_KEYS)
+    with Keyserver(SUBKEY_KEYS) as live:
+        params = _import_subkey_keys(box, live, 'present')
+        keyring = box.keyring()
+        sub0 = keyring[k0]['subkeys'][1]['fpr']
+        sub2 = keyring[k2]['subkeys'][0]['fpr']
+        for key_id in (sub0[-16:], k1[-8:], '0x' + sub2):
+            run = meter.run('gpg_import', dict(params, key_id=key_id), [live])
+            check(not run.result['changed'] and run.subprocesses == 1,
+                  '%s: changed %s with %d subprocesses' % (key_id, run.result['changed'], run.subprocesses))
+        run = meter.run('gpg_import', dict(params, key_id=sub0[-16:], state='absent'), [live])
+    check(run.result['changed'] and any(k0 in c for c in run.calls if '--delete-keys' in c),
+          'deleting by subkey id did not target the primary key: %s' % run.calls)
+    check(sorted(box.keyring()) == [k1, k2], 'keyring holds %s' % sorted(box.keyring()))
+
+
+@scenario(subprocesses=5, requests=2, wall=5)
+def gpg_import_latest_stale(box, meter):
+    """only keys due for a refresh go to the keyserver, expired subkeys do not make a key due"""
+    now = int(time.time())
+    a, b, c = sorted(SUBKEY_KEYS)
+    keys = dict(SUBKEY_KEYS)
+    with Keyserver(keys) as live:
+        # fresh imports count as refreshed
+        params = _import_subkey_keys(box, live, 'latest')
+        keyring = box.keyring()
+        # a: a subkey rotated out long ago and a current one
+        keyring[a]['subkeys'][0].update(validity='e', expires=now - 400 * 86400)
+        keyring[a]['subkeys'][1]['expires'] = now + 365 * 86400
+        # b: a subkey about to expire
+        keyring[b]['subkeys'][1]['expires'] = now + 86400
+        box.write_keyring(keyring)
+        # c: refreshed longer ago than max_age, with a new user id on the keyserver
+        path = box.path('gpg_import', 'refreshed.json')
+        with open(path) as f:
+            refreshed = json.load(f)
+        with open(path, 'w') as f:
+            json.dump(dict((k, 0 if c.endswith(k) else t) for k, t in refreshed.items()), f)
+        keys[c] = pgp.make_key(SUBKEY_SEEDS[c], uid='Renamed <renamed@example.org>', subkeys=2)[1]
+
+        runs = [meter.run('gpg_import', dict(params, key_id=fpr), [live]) for fpr in (a, b, c)]
+    check([r.subprocesses for r in runs] == [1, 2, 2], 'subprocesses per key %s' % [r.subprocesses for r in runs])
+    check([r.result['changed'] for r in runs] == [False, False, True],
+          'changed per key %s' % [r.result['changed'] for r in runs])
+    check(box.keyring()[c]['uid'].startswith('Renamed'), 'the refresh did not update the key')
+
+
+# -- aur_facts ----------------------------------------------------------------
+
+@scenario(subprocesses=0, requests=2, wall=5)
+def aur_facts_200_cached(box, meter):
+    """200 names take two batched RPC requests, the second run is served from the cache"""
+    local = box.path('pacman-db', 'local')
+    os.makedirs(local)
+    for n in AUR_NAMES:
+        os.mkdir(os.path.join(local, '%s-1.0-1' % n))
+    with AurRpc(dict((n, '1.0-1' if i % 20 else '1.1-1') for i, n in enumerate(AUR_NAMES))) as aur:
+        params = {'names': AUR_NAMES, 'db_path': box.path('pacman-db'), 'aur_url': aur.url,
+                  'cache_dir': box.path('aur_facts')}
+        first = meter.run('aur_facts', params, [aur])
+        second = meter.run('aur_facts', params, [aur])
+    outdated = first.result['ansible_facts']['aur_outdated']
+    check(len(outdated) == 10, '%d outdated packages, expected 10' % len(outdated))
+    check(second.result['ansible_facts'] == first.result['ansible_facts'], 'cached facts differ')
+
+
+# -- mirrorlist ---------------------------------------------------------------
+
+@scenario(subprocesses=0, requests=15, wall=3)
+def mirrorlist_8_candidates(box, meter):
+    """7 mirrors and a dead one probed concurrently, ranked by latency plus transfer time"""
+    now = int(time.time())
+    size = 64 * 1024
+    mirrors = [Mirror(now, size, delay=0.05),
+               Mirror(now - 60, size, delay=0.37),
+               Mirror(now - 120, size, delay=0.21),
+               Mirror(now - 200000, size),                       # fast, but lagging behind
+               Mirror(now - 180, size, delay=0.13),
+               Mirror(now - 240, size, delay=0.01, rate=size),   # answers first, a second to deliver
+               Mirror(now - 300, size, delay=0.29)]
+    dead = Blackhole()
+    try:
+        src = box.path('mirrorlist.candidates')
+        with open(src, 'w') as f:
+            f.write('Server = %s/$repo/os/$arch\n' % dead.url)
+            for m in mirrors:
+                f.write('#Server = %s\n' % m.server_line)
+        params = {'src': src, 'dest': box.path('mirrorlist'), 'count': 5, 'timeout': 1,
+                  'cache_path': box.path('probe.json')}
+        first = meter.run('mirrorlist', params, mirrors + [dead])
+        second = meter.run('mirrorlist', params, mirrors + [dead])
+    finally:
+        for m in mirrors:
+            m.close()
+        dead.close()
+    expected = [mirrors[i].server_line for i in (0, 4, 2, 6, 1)]
+    check(first.result['mirrors'] == expected, 'ranked %s, expected %s' % (first.result['mirrors'], expected))
+    check(second.result['cached'] and not second.result['changed'], 'second run probed again')
+
+
+@scenario(subprocesses=0, requests=5, wall=3)
+def mirrorlist_malformed_response(box, meter):
+    """a mirror answering with something that is not HTTP is dropped, the others are ranked"""
+    now = int(time.time())
+    mirrors = [Mirror(now, delay=0.1), Mirror(now)]
+    bad = Malformed()
+    try:
+        src = box.path('mirrorlist.candidates')
+        with open(src, 'w') as f:
+            f.write('Server = %s/$repo/os/$arch\n' % bad.url)
+            for m in mirrors:
+                f.write('Server = %s\n' % m.server_line)
+        run = meter.run('mirrorlist', {'src': src, 'dest': box.path('mirrorlist'), 'timeout': 1,
+                                       'cache_path': box.path('probe.json')}, mirrors + [bad])
+    finally:
+        for m in mirrors:
+            m.close()
+        bad.close()
+    expected = [mirrors[1].server_line, mirrors[0].server_line]
+    check(run.result['mirrors'] == expected, 'ranked %s, expected %s' % (run.result['mirrors'], expected))
+    check('error' in run.result['results'][0], 'malformed mirror probed as %s' % run.result['results'][0])
+
+
+# -- ssh_config ---------------------------------------------------------------
+
+@scenario(subprocesses=0, requests=0, wall=2)
+def ssh_config_add_host(box, meter):
+    params = {'host': 'build', 'hostname': 'build.example.org', 'remote_user': 'builder',
+              'user': box.user}
+    first = meter.run('ssh_config', params)
+    second = meter.run('ssh_config', params)
+    check(first.result['changed'] and not second.result['changed'], 'not idempotent')
+
+
+def main(argv):
+    selected = [s for s in SCENARIOS if not argv or any(a in s.name for a in argv)]
+    width = max(len(s.name) for s in selected)
+    print('%-*s  %13s  %9s  %14s  %s' % (width, 'scenario', 'subprocesses', 'requests', 'wall', 'tools'))
+    failed = 0
+    for s in selected:
+        report = execute(s)
+        m, b = report.meter, s.budget
+        tools = ' '.join('%s=%d' % kv for kv in sorted(m.tools.items()))
+        print('%-*s  %6d / %-4d  %4d / %-2d  %5.2fs / %-5s  %s'
+              % (width, s.name, m.subprocesses, b.subprocesses, m.requests, b.requests, m.wall,
+                 '%gs' % b.wall, tools))
+        for problem in report.problems:
+            print('%*s  ! %s' % (width, '', problem))
+        failed += not report.ok
+    if failed:
+        print('%d of %d scenarios failed or went over budget' % (failed, len(selected)))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
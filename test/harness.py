@@ -0,0 +1,301 @@
+# -*- coding: utf-8 -*-
+"""Runs the modules in library/ offline, against fake executables in test/bin.
+
+`ansible.module_utils.basic` is replaced by a stub whose AnsibleModule records
+every run_command() and then really runs it, with test/bin first on the PATH,
+so the fake pacman, packer, makepkg, repo-add, ccache, sudo and gpg see the
+same command lines the real ones would. Each fake appends its command line to
+$FAKE_LOG as well, which also catches what runs behind sudo. git is the real
+one, against local repositories.
+
+    with Sandbox() as box:
+        box.installed(['yay'])
+        run = box.run('packer', {'name': 'yay'})
+        run.result, run.subprocesses, run.calls, run.tools, run.wall
+"""
+
+import json
+import os
+import pwd
+import shlex
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import types
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+LIBRARY = os.path.join(os.path.dirname(HERE), 'library')
+MODULE_UTILS = os.path.join(os.path.dirname(HERE), 'module_utils')
+BIN = os.path.join(HERE, 'bin')
+
+BOOLEANS_TRUE = ['yes', 'on', '1', 'true', 'True', 1, True]
+BOOLEANS_FALSE = ['no', 'off', '0', 'false', 'False', 0, False]
+BOOLEANS = BOOLEANS_TRUE + BOOLEANS_FALSE
+
+
+class ModuleExit(Exception):
+    """raised by exit_json() and fail_json(), carries the module result"""
+
+    def __init__(self, result):
+        Exception.__init__(self, result.get('msg', ''))
+        self.result = result
+
+
+def _convert(name, value, kind):
+    if value is None or kind in (None, 'str', 'raw'):
+        return value
+    if kind == 'bool':
+        if value in BOOLEANS_TRUE:
+            return True
+        if value in BOOLEANS_FALSE:
+            return False
+        raise ValueError('%s: %r is not a boolean' % (name, value))
+    if kind == 'int':
+        return int(value)
+    if kind == 'float':
+        return float(value)
+    if kind == 'list':
+        return [v.strip() for v in value.split(',')] if isinstance(value, str) else list(value)
+    if kind == 'dict':
+        return dict(value)
+    raise ValueError('%s: unknown type %s' % (name, kind))
+
+
+class AnsibleModule(object):
+    """the parts of ansible's AnsibleModule the modules in library/ use"""
+
+    # set by Sandbox.run() for the module being run
+    current = None
+
+    def __init__(self, argument_spec, supports_check_mode=False, **kwargs):
+        run = AnsibleModule.current
+        unknown = set(run.params) - set(argument_spec)
+        if unknown:
+            raise ValueError('unsupported parameters: %s' % ', '.join(sorted(unknown)))
+        self.params = {}
+        for name, spec in argument_spec.items():
+            value = run.params.get(name, spec.get('default'))
+            if value is None and spec.get('required'):
+                raise ValueError('missing required parameter %s' % name)
+            value = _convert(name, value, spec.get('type'))
+            choices = spec.get('choices')
+            if value is not None and choices and value not in choices:
+                raise ValueError('%s: %r is not one of %s' % (name, value, choices))
+            self.params[name] = value
+        self.check_mode = run.check_mode and supports_check_mode
+        self._run = run
+
+    def run_command(self, args, check_rc=False, data=None, cwd=None, **kwargs):
+        argv = shlex.split(args) if isinstance(args, str) else list(args)
+        self._run.calls.append(' '.join(argv))
+        proc = subprocess.Popen(argv, stdin=subprocess.PIPE if data is not None else subprocess.DEVNULL,
+                                stdout=subprocess.PIPE, stderr=subprocess.PIPE, cwd=cwd,
+                                universal_newlines=True)
+        stdout, stderr = proc.communicate(data + '\n' if data is not None else None)
+        if check_rc and proc.returncode != 0:
+            self.fail_json(cmd=args, rc=proc.returncode, stdout=stdout, stderr=stderr, msg=stderr.rstrip())
+        return proc.returncode, stdout, stderr
+
+    def get_bin_path(self, name, required=False, opt_dirs=None):
+        path = shutil.which(name)
+        if path is None and required:
+            self.fail_json(msg='Failed to find required executable %s' % name)
+        return path
+
+    def set_owner_if_different(self, path, owner, changed):
+        return changed
+
+    def set_group_if_different(self, path, group, changed):
+        return changed
+
+    def set_mode_if_different(self, path, mode, changed):
+        return changed
+
+    def exit_json(self, **kwargs):
+        kwargs.setdefault('changed', False)
+        raise ModuleExit(kwargs)
+
+    def fail_json(self, msg, **kwargs):
+        kwargs.update(msg=msg, failed=True)
+        raise ModuleExit(kwargs)
+
+
+def _stub_module_utils():
+    basic = types.ModuleType('ansible.module_utils.basic')
+    basic.AnsibleModule = AnsibleModule
+    basic.BOOLEANS = BOOLEANS
+    basic.os = os
+    basic.__all__ = ['AnsibleModule', 'BOOLEANS', 'os']
+    ansible = types.ModuleType('ansible')
+    utils = types.ModuleType('ansible.module_utils')
+    ansible.module_utils = utils
+    utils.basic = basic
+    modules = {'ansible': ansible, 'ansible.module_utils': utils, 'ansible.module_utils.basic': basic}
+    # the repo's own module_utils, as ansible would ship them
+    for fn in sorted(os.listdir(MODULE_UTILS)):
+        if fn.endswith('.py'):
+            name = 'ansible.module_utils.%s' % fn[:-3]
+            mod = types.ModuleType(name)
+            path = os.path.join(MODULE_UTILS, fn)
+            with open(path) as f:
+                exec(compile(f.read(), path, 'exec'), mod.__dict__)
+            setattr(utils, fn[:-3], mod)
+            modules[name] = mod
+    return modules
+
+
+class Run(object):
+    """one module invocation and what it cost"""
+
+    def __init__(self, name, params, check_mode):
+        self.name = name
+        self.params = params
+        self.check_mode = check_mode
+        self.calls = []
+        self.log = []
+        self.result = None
+        self.wall = 0.0
+
+    @property
+    def subprocesses(self):
+        return len(self.calls)
+
+    @property
+    def tools(self):
+        """executions per fake tool, including those run behind sudo and env"""
+        counts = {}
+        for line in self.log:
+            tool = line.split(' ', 1)[0]
+            counts[tool] = counts.get(tool, 0) + 1
+        return counts
+
+    @property
+    def failed(self):
+        return bool(self.result.get('failed'))
+
+
+class Sandbox(object):
+    """a temporary root for the fakes' state, with test/bin first on the PATH"""
+
+    def __init__(self):
+        self.root = tempfile.mkdtemp(prefix='library-harness-')
+        self.home = os.path.join(self.root, 'home')
+        self.gnupghome = os.path.join(self.root, 'gnupg')
+        self.log_path = os.path.join(self.root, 'fake.log')
+        for d in (self.home, self.gnupghome, os.path.join(self.root, 'pacman')):
+            os.makedirs(d)
+        self.user = pwd.getpwuid(os.getuid()).pw_name
+        self.env = {
+            'PATH': '%s:%s' % (BIN, os.environ.get('PATH', '/usr/bin:/bin')),
+            'FAKE_ROOT': self.root,
+            'FAKE_LOG': self.log_path,
+            'GNUPGHOME': self.gnupghome,
+            'HOME': self.home,
+            'SUDO_USER': self.user,
+        }
+
+    def path(self, *parts):
+        return os.path.join(self.root, *parts)
+
+    def installed(self, names, version='1.0-1'):
+        """add `names` to the fake local pacman database"""
+        with open(self.path('pacman', 'local'), 'a') as f:
+            for n in names:
+                f.write('%s %s\n' % (n, version))
+
+    def in_sync_db(self, names):
+        """add `names` to the fake sync databases"""
+        with open(self.path('pacman', 'sync'), 'a') as f:
+            for n in names:
+                f.write('%s\n' % n)
+
+    def forget(self, names):
+        """remove `names` from the fake local pacman database, as on a fresh host"""
+        db = self.local_db()
+        with open(self.path('pacman', 'local'), 'w') as f:
+            for n, v in sorted(db.items()):
+                if n not in names:
+                    f.write('%s %s\n' % (n, v))
+
+    def keyring(self):
+        """the fake gpg keyring, primary fingerprint -> {uid, validity, expires, subkeys}"""
+        try:
+            with open(os.path.join(self.gnupghome, 'fake-keyring.json')) as f:
+                return json.load(f)
+        except IOError:
+            return {}
+
+    def write_keyring(self, keyring):
+        with open(os.path.join(self.gnupghome, 'fake-keyring.json'), 'w') as f:
+            json.dump(keyring, f, indent=1)
+
+    def local_db(self):
+        try:
+            with open(self.path('pacman', 'local')) as f:
+                return dict(l.split() for l in f if l.strip())
+        except IOError:
+            return {}
+
+    def _expanduser(self, path, _orig=os.path.expanduser):
+        # every user's home is the sandbox home, so nothing outside the sandbox is touched
+        if path.startswith('~'):
+            rest = path[1:].split('/', 1)
+            return os.path.join(self.home, rest[1]) if len(rest) > 1 else self.home
+        return _orig(path)
+
+    def run(self, name, params, check_mode=False):
+        """run library/<name> (or <name>.py) with `params`, returns the Run"""
+        path = os.path.join(LIBRARY, name)
+        if not os.path.exists(path):
+            path += '.py'
+        with open(path) as f:
+            source = f.read()
+        run = Run(name, params, check_mode)
+        saved_env = dict((k, os.environ.get(k)) for k in self.env)
+        stubs = _stub_module_utils()
+        saved_modules = dict((k, sys.modules.get(k)) for k in stubs)
+        saved_expanduser = os.path.expanduser
+        os.environ.update(self.env)
+        sys.modules.update(stubs)
+        os.path.expanduser = self._expanduser
+        AnsibleModule.current = run
+        log_start = os.path.getsize(self.log_path) if os.path.exists(self.log_path) else 0
+        # ssh_config expects the module boilerplate to be pasted in by ansible
+        namespace = {'__name__': '__main__', '__file__': path,
+                     'AnsibleModule': AnsibleModule, 'BOOLEANS': BOOLEANS}
+        start = time.time()
+        try:
+            exec(compile(source, path, 'exec'), namespace)
+            raise AssertionError('%s returned without exit_json() or fail_json()' % name)
+        except ModuleExit as e:
+            run.result = e.result
+        finally:
+            run.wall = time.time() - start
+            AnsibleModule.current = None
+            os.path.expanduser = saved_expanduser
+            for k, v in saved_modules.items():
+                if v is None:
+                    sys.modules.pop(k, None)
+                else:
+                    sys.modules[k] = v
+            for k, v in saved_env.items():
+                if v is None:
+                    os.environ.pop(k, None)
+                else:
+                    os.environ[k] = v
+        if os.path.exists(self.log_path):
+            with open(self.log_path) as f:
+                f.seek(log_start)
+                run.log = f.read().splitlines()
+        return run
+
+    def close(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""Synthetic OpenPGP v4 public keys for the fake gpg and the keyserver stand-in.
+
+The keys are structurally valid (packet framing, fingerprints, armor checksum)
+but carry no usable key material or signatures; nothing here verifies them."""
+
+import base64
+import hashlib
+import random
+import struct
+
+
+def _packet(tag, body):
+    # new format header, always with a two or five octet length
+    if len(body) < 8384:
+        n = len(body) - 192
+        length = struct.pack('>BB', (n >> 8) + 192, n & 0xff) if len(body) >= 192 else struct.pack('>B', len(body))
+    else:
+        length = b'\xff' + struct.pack('>I', len(body))
+    return struct.pack('>B', 0xc0 | tag) + length + body
+
+
+def _mpi(value):
+    raw = value.to_bytes((value.bit_length() + 7) // 8, 'big')
+    return struct.pack('>H', value.bit_length()) + raw
+
+
+def _crc24(data):
+    crc = 0xb704ce
+    for byte in bytearray(data):
+        crc ^= byte << 16
+        for _ in range(8):
+            crc <<= 1
+            if crc & 0x1000000:
+                crc ^= 0x1864cfb
+    return crc & 0xffffff
+
+
+def _key_body(rnd, created):
+    n = rnd.getrandbits(2048) | (1 << 2047) | 1
+    body = struct.pack('>BIB', 4, created, 1) + _mpi(n) + _mpi(65537)
+    return body, hashlib.sha1(b'\x99' + struct.pack('>H', len(body)) + body).hexdigest().upper()
+
+
+def make_key(seed, uid=None, subkeys=0):
+    """(fingerprint, armored public key block) of a deterministic RSA-shaped key
+
+    The fingerprints only depend on `seed`, so a key with another `uid` is the
+    same key with a changed user id, as after an update on a keyserver."""
+    rnd = random.Random(seed)
+    body, fpr = _key_body(rnd, 1500000000 + seed)
+    uid = (uid or 'Test Key %d <key%d@example.org>' % (seed, seed)).encode('utf-8')
+    data = _packet(6, body) + _packet(13, uid)
+    for i in range(subkeys):
+        data += _packet(14, _key_body(rnd, 1500000000 + seed + i + 1)[0])
+    b64 = base64.b64encode(data).decode('ascii')
+    lines = [b64[i:i + 64] for i in range(0, len(b64), 64)]
+    crc = base64.b64encode(struct.pack('>I', _crc24(data))[1:]).decode('ascii')
+    armored = '-----BEGIN PGP PUBLIC KEY BLOCK-----\n\n%s\n=%s\n-----END PGP PUBLIC KEY BLOCK-----\n' \
+              % ('\n'.join(lines), crc)
+    return fpr, armored
+
+
+def dearmor(text):
+    lines = text.strip().splitlines()
+    start = lines.index('') + 1 if '' in lines else 1
+    return base64.b64decode(''.join(l for l in lines[start:] if not l.startswith(('=', '-----'))))
+
+
+def parse_keys(data):
+    """(fingerprint, user id, subkey fingerprints) of every primary key in `data`"""
+    keys = []
+    i = 0
+    while i < len(data):
+        tag = data[i] & 0x3f
+        length = data[i + 1]
+        if length < 192:
+            i += 2
+        elif length < 255:
+            length = ((length - 192) << 8) + data[i + 2] + 192
+            i += 3
+        else:
+            length = struct.unpack('>I', data[i + 2:i + 6])[0]
+            i += 6
+        body = data[i:i + length]
+        i += length
+        if tag in (6, 14):
+            fpr = hashlib.sha1(b'\x99' + struct.pack('>H', len(body)) + body).hexdigest().upper()
+            if tag == 6:
+                keys.append([fpr, '', []])
+            elif keys:
+                keys[-1][2].append(fpr)
+        elif tag == 13 and keys:
+            keys[-1][1] = body.decode('utf-8', 'replace')
+    return [tuple(k) for k in keys]
@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+"""Local stand-ins for the network services the modules talk to.
+
+Every stand-in counts the requests it answers, so scenarios can budget network
+round trips the same way they budget subprocesses."""
+
+import json
+import socket
+import threading
+import time
+
+import pgp
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+    from urllib.parse import parse_qs, urlparse
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+    from urlparse import parse_qs, urlparse
+
+
+class _Server(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class StandIn(object):
+    """an HTTP/1.1 server on a free local port, answering with `self.handle(path)`
+
+    Every answer is delayed by `delay` seconds and, with a `rate`, sent at that
+    many bytes per second."""
+
+    def __init__(self, delay=0, rate=None):
+        self.delay = delay
+        self.rate = rate
+        self.requests = 0
+        self.paths = []
+        self._lock = threading.Lock()
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                with standin._lock:
+                    standin.requests += 1
+                    standin.paths.append(self.path)
+                if standin.delay:
+                    time.sleep(standin.delay)
+                status, body = standin.handle(self.path)
+                if not isinstance(body, bytes):
+                    body = body.encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                if not standin.rate:
+                    self.wfile.write(body)
+                    return
+                # throttled to `rate` bytes per second
+                for i in range(0, len(body), 8192):
+                    self.wfile.write(body[i:i + 8192])
+                    self.wfile.flush()
+                    time.sleep(len(body[i:i + 8192]) / float(standin.rate))
+
+            def log_message(self, *args):
+                pass
+
+        self.server = _Server(('127.0.0.1', 0), Handler)
+        self.port = self.server.server_address[1]
+        self.url = 'http://127.0.0.1:%d' % self.port
+        self._thread = threading.Thread(target=self.server.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def handle(self, path):
+        return 404, ''
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class Keyserver(StandIn):
+    """HKP lookups of the armored keys in `keys`, a dict fingerprint -> armored block
+
+    Like real keyservers it also finds keys by the ids of their subkeys."""
+
+    def __init__(self, keys, delay=0):
+        self.keys = keys
+        StandIn.__init__(self, delay)
+        self.hkp_url = 'hkp://127.0.0.1:%d' % self.port
+
+    def handle(self, path):
+        url = urlparse(path)
+        search = parse_qs(url.query).get('search', [''])[0].upper()
+        if url.path != '/pks/lookup' or not search.startswith('0X'):
+            return 404, 'not found'
+        for armored in self.keys.values():
+            for fpr, uid, subkeys in pgp.parse_keys(pgp.dearmor(armored)):
+                if any(f.endswith(search[2:]) for f in [fpr] + subkeys):
+                    return 200, armored
+        return 404, 'no key found'
+
+
+class AurRpc(StandIn):
+    """the info call of the AUR RPC, for the packages in `versions`, a dict name -> version"""
+
+    def __init__(self, versions, delay=0):
+        self.versions = versions
+        StandIn.__init__(self, delay)
+
+    def handle(self, path):
+        url = urlparse(path)
+        if not url.path.startswith('/rpc'):
+            return 404, 'not found'
+        names = parse_qs(url.query).get('arg[]', [])
+        results = [{'Name': n, 'PackageBase': n, 'Version': self.versions[n]}
+                   for n in names if n in self.versions]
+        return 200, json.dumps({'version': 5, 'type': 'multiinfo',
+                                'resultcount': len(results), 'results': results})
+
+
+class Mirror(StandIn):
+    """a pacman mirror with a lastsync file and a sample database of `size` bytes"""
+
+    def __init__(self, lastsync, size=256 * 1024, delay=0, rate=None):
+        self.lastsync = lastsync
+        self.sample = b'\0' * size
+        StandIn.__init__(self, delay, rate)
+        self.server_line = '%s/$repo/os/$arch' % self.url
+
+    def handle(self, path):
+        if path == '/lastsync':
+            return 200, '%d\n' % self.lastsync
+        if path.endswith('.db'):
+            return 200, self.sample
+        return 404, 'not found'
+
+
+class Blackhole(object):
+    """a port that accepts connections and never answers, like a wedged keyserver"""
+
+    def __init__(self):
+        self.requests = 0
+        self._conns = []
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.bind(('127.0.0.1', 0))
+        self.sock.listen(64)
+        self.port = self.sock.getsockname()[1]
+        self.hkp_url = 'hkp://127.0.0.1:%d' % self.port
+        self.url = 'http://127.0.0.1:%d' % self.port
+        self._thread = threading.Thread(target=self._accept)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _accept(self):
+        while True:
+            try:
+                conn, addr = self.sock.accept()
+            except (IOError, OSError):
+                return
+            self.requests += 1
+            self._serve(conn)
+
+    def _serve(self, conn):
+        # left hanging until close()
+        self._conns.append(conn)
+
+    def close(self):
+        for conn in self._conns:
+            conn.close()
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except (IOError, OSError):
+            pass
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class Malformed(Blackhole):
+    """a port that reads the request and answers with something that is not HTTP"""
+
+    def __init__(self, answer=b'garbage\r\n\r\n'):
+        self.answer = answer
+        Blackhole.__init__(self)
+
+    def _serve(self, conn):
+        try:
+            conn.recv(65536)
+            conn.sendall(self.answer)
+        except (IOError, OSError):
+            pass
+        conn.close()
@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+"""The bench scenarios as tests: a scenario that fails or goes over budget fails."""
+
+import pytest
+
+import bench
+
+
+@pytest.mark.parametrize('scenario', bench.SCENARIOS, ids=[s.name for s in bench.SCENARIOS])
+def test_within_budget(scenario):
+    report = bench.execute(scenario)
+    assert report.ok, '%s: %s' % (scenario.name, '; '.join(report.problems))
+
+
+def test_over_budget_fails(monkeypatch):
+    # a budget one subprocess short of what the module needs must be reported
+    scenario = bench.packer_resolve_deps
+    monkeypatch.setattr(scenario, 'budget', bench.Budget(scenario.budget.subprocesses - 1,
+                                                         scenario.budget.requests, scenario.budget.wall))
+    report = bench.execute(scenario)
+    assert not report.ok
+    assert report.problems == ['11 subprocesses, budget 10']